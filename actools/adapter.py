@@ -338,7 +338,8 @@ def acadapter(command, data=None):
     if data:
         cmd += [json.dumps(data)]
     
-    logger.debug("> {0}".format(" ".join(cmd)))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("> %s", " ".join(cmd))
     p = subprocess.Popen(cmd, stdout=subprocess.PIPE,
                          stderr=subprocess.PIPE)
     out, err = p.communicate()
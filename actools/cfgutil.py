@@ -82,7 +82,9 @@ class Result(object):
         self.command = cfgout.get('Command', '')
         self.ecids = cfgout.get('Devices', [])
         self.output = cfgout.get('Output', {})
-        self.missing = [x for x in ecids if x not in self.ecids]
+        # hashed once (avoids re-scanning Devices for every ECID)
+        _found = set(self.ecids)
+        self.missing = [x for x in ecids if x not in _found]
 
     def get(self, ecid, default=None):
         return self.output.get(ecid, default)
@@ -348,7 +350,8 @@ def cfgutil(command, ecids, args, auth=None):
     # finally, add the command and args
     cmd += [command] + args
 
-    logger.info("> {0}".format(" ".join(cmd)))
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("> %s", " ".join(cmd))
     p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     out, err = p.communicate()    
 
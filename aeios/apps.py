@@ -9,6 +9,7 @@ from distutils import version
 
 import config
 from . import resources
+from . import utility
 
 from device import DeviceList
 from actools import adapter, cfgutil
@@ -286,6 +287,9 @@ class AppManager(object):
 
         self._apps = AppList()
         self.alerts = []
+        # cached paths of local .ipa files (invalidated by mtime)
+        self._localapps = None
+        self._localapps_mtime = None
 
     @property
     def error(self):
@@ -413,16 +417,24 @@ class AppManager(object):
             self.config.update({group: list(modified)})
         self._record = self.config.read()
         
-    def unknown(self, device, appnames=None):
+    def unknown(self, device, appnames=None, known=None):
         """
+        :param known:   names of all scoped apps (default: self.list())
+                            useful when checking multiple devices
+
         :returns: AppList of unknown apps (new apps)
         """
-        applist = AppList([App(x) for x in device.apps])
+        records = device.apps
         if not appnames:
-            appset = set(applist.names)
+            appset = set(_appnames(records))
         else:
             appset = set(appnames)
-        appset.difference_update(self.list())
+        if known is None:
+            known = self.list()
+        appset.difference_update(known)
+        if not appset:
+            return AppList()
+        applist = (App(x) for x in records)
         return AppList([x for x in applist if x.name in appset])
 
     # TO-DO: fix/remove this
@@ -461,18 +473,13 @@ class AppManager(object):
         :param devices: DeviceList
         :return: list of app names that are commonly installed
         """
-        # set of all installed app names for all specified devices
-        _installed = set().union([App(a).name for d in devices for a in d.apps])
+        # installed app names per device (each record is only read once)
+        _names = [_appnames(d.apps) for d in devices]
+        if not _names:
+            return set()
+        # app names installed on every specified device
+        _installed = _names[0].intersection(*_names[1:])
         self.log.debug("_installed: %r", _installed)
-        for device in devices:
-            # names = AppList([app for app in device.apps]).names
-            _apps = [app for app in device.apps]
-            self.log.debug("_apps: %r", _apps)
-            _applist = AppList(App(a) for a in _apps)
-            self.log.debug("_applist: %r", _applist)
-            names = _applist.names
-            self.log.debug("names: %r", names)
-            _installed.intersection_update(names)
         # TO-DO: returns set, should return list?
         return _installed
 
@@ -564,6 +571,10 @@ class AppManager(object):
                 self.log.debug("already commonly installed: %r", _installed)
                 self.log.debug("updating applist")
                 _apps = list(set(apps).difference(_installed))
+                if not _apps:
+                    # nothing to install (don't drive Apple Configurator)
+                    self.log.debug("all apps installed: %s", _devices)
+                    continue
                 timeout = 60 * len(_apps)
                 self.log.debug("new applist: %r", _apps)
                 self.log.info("installing: %r: %s", _apps, _devices)
@@ -600,13 +611,19 @@ class AppManager(object):
         #           - wait for "Downloading apps" to disappear
         #           - requires hook
         path = self.resources.apps
-        apps = [x for x in os.listdir(path) if x.endswith('.ipa')]
-        if not apps:
+        # only re-scan the apps directory if it has been modified
+        rescan, mtime = utility.modified(path, self._localapps_mtime)
+        if self._localapps is None or rescan:
+            self.log.debug("scanning local apps: %r", path)
+            apps = [x for x in os.listdir(path) if x.endswith('.ipa')]
+            self._localapps = [os.path.join(path, x) for x in apps]
+            self._localapps_mtime = mtime
+
+        paths = self._localapps
+        if not paths:
             self.log.debug("no local apps were found")
             return
-
-        self.log.debug("local apps: '%s'", "', '".join(apps))
-        paths = [os.path.join(path, x) for x in apps]
+        self.log.debug("local apps: %r", paths)
 
         try:
             self.log.info("installing local apps on: %s", devices)
@@ -640,9 +657,15 @@ class AppManager(object):
         """
         # self.installedapps(devices)
         needs_apps = DeviceList()
+        # app scope only depends on the model (see groups())
+        scoped = {}
         for device in devices:
-            installed = self.apps(device.apps)
-            if self.list(device, exclude=installed.names):
+            appset = scoped.get(device.model)
+            if appset is None:
+                appset = frozenset(self.list(device))
+                scoped[device.model] = appset
+            # only names are compared (no need to build the AppList)
+            if appset - _appnames(device.apps):
                 needs_apps.append(device)
         return needs_apps
     
@@ -707,6 +730,15 @@ class AppManager(object):
         return _missing
 
 
+def _appnames(records):
+    """
+    :param records:     list of installedApps records (see Device.apps)
+    :returns: frozenset of app names (same as App(x).name for each record)
+    """
+    # no need to build every App (or parse every version)
+    return frozenset(u"{0!s}".format(x['itunesName']) for x in records)
+
+
 def hook(trigger, callback):
     # mutable var so we can bleed out of namespace
     _hook = {'done': False}
@@ -1,8 +1,10 @@
 import os
+import copy
 import plistlib
 # import filelock
 import logging
 import fcntl
+import contextlib
 import threading
 import time
 import xml.parsers.expat
@@ -23,6 +25,7 @@ logging.getLogger(__name__).addHandler(logging.NullHandler())
 __all__ = [
     'Manager', 
     'FileLock',
+    'ReentrantFileLock',
     'TimeoutError',
     'ConfigError'
 ]
@@ -186,6 +189,76 @@ class FileLock(object):
         self.release(force=True)
 
 
+class ReentrantFileLock(FileLock):
+    """
+    FileLock owned by a single thread
+
+    Re-acquiring from the owning thread only increments a counter
+    (no file locking), other threads in the same process wait for 
+    the owner to release the lock, the same as other processes do
+    """
+    def __init__(self, file, timeout=-1):
+        super(ReentrantFileLock, self).__init__(file, timeout)
+        self._owner = None
+        self._depth = 0
+        self._owner_lock = threading.Lock()
+
+    @property
+    def owned(self):
+        """
+        :returns: True, if the current thread holds the lock
+        """
+        return self._owner == threading.current_thread().ident
+
+    def acquire(self, timeout=None, poll_intervall=0.05):
+        if self.owned:
+            self._depth += 1
+            return ReturnProxy(lock=self)
+
+        if not timeout:
+            timeout = self.timeout
+        start = time.time()
+        # wait for other threads in this process
+        while not self._owner_lock.acquire(False):
+            if timeout >= 0 and (time.time() - start) > timeout:
+                raise TimeoutError(self._file)
+            time.sleep(poll_intervall)
+        try:
+            if timeout >= 0:
+                # whatever is left of the timeout (FileLock treats 0 as
+                # default, so always allow a single attempt)
+                timeout = max(timeout - (time.time() - start), 0.001)
+            super(ReentrantFileLock, self).acquire(timeout, poll_intervall)
+        except:
+            self._owner_lock.release()
+            raise
+
+        self._owner = threading.current_thread().ident
+        self._depth = 1
+        return ReturnProxy(lock=self)
+
+    def release(self, force=False):
+        """
+        Release the lock (once released by the owner as many times as
+        it was acquired)
+
+        :arg bool force:
+            If true, the lock is released regardless of owner or count
+        """
+        if self._owner is None:
+            return
+        if not force:
+            if not self.owned:
+                return
+            self._depth -= 1
+            if self._depth > 0:
+                return
+        self._owner = None
+        self._depth = 0
+        super(ReentrantFileLock, self).release(force=True)
+        self._owner_lock.release()
+
+
 class Manager(object):
     """
     This class is meant to allow scripts to read and serialize 
@@ -222,8 +295,9 @@ class Manager(object):
         configuration directory exists (creates directory if not)
         """
         if not logger:
+            # NullHandler was added once at import (adding one here
+            #   grew the handler list with every Manager)
             logger = logging.getLogger(__name__)
-            logger.addHandler(logging.NullHandler())
         self.log = logger
         lockdir = self.__class__.TMP
         if not os.path.exists(lockdir):
@@ -251,29 +325,91 @@ class Manager(object):
         self.lockfile = "{0}/{1}.lockfile".format(lockdir, id)
         # self.lock = filelock.FileLock(self.lockfile, **kwargs)
         self.lock = FileLock(self.lockfile, **kwargs)
+        # per-thread in-memory copy used by batch()
+        self._batch = threading.local()
+        # re-use the last read while the file is unchanged (see read())
+        self.cache = False
+        self._cached = None
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Hold the lock and keep reads and writes in memory, writing
+        back to disk once when the block exits (only if modified)
 
+        EXAMPLE:
+            with conf.batch():
+                conf.update({'foo': 'bar'})
+                conf.delete('baz')      # still a single write
+        """
+        if getattr(self._batch, 'active', False):
+            # already batching (join the outer batch)
+            yield self
+            return
+        with self.lock.acquire():
+            try:
+                self._batch.data = self.read()
+            except Missing:
+                self._batch.data = None
+            self._batch.modified = False
+            self._batch.active = True
+            try:
+                yield self
+            finally:
+                self._batch.active = False
+                data, self._batch.data = self._batch.data, None
+                if self._batch.modified:
+                    self._cached = None
+                    plistlib.writePlist(data, self.file)
 
     def write(self, data):
         """
         Serializes specified settings to file
         """
+        if getattr(self._batch, 'active', False):
+            self._batch.data = copy.deepcopy(data)
+            self._batch.modified = True
+            return
         with self.lock.acquire():
+            self._cached = None
             plistlib.writePlist(data, self.file)
 
     def read(self):
         """
         :returns: data structure (list|dict) as read from disk
         :raises: ConfigError if unable to read
+
+        NOTE: if self.cache is True, the previous read is returned
+              (as a copy) for as long as the file's mtime, size, and
+              inode are unchanged. Files modified within the last
+              second are always re-read (mtime granularity)
         """
-        if not os.path.exists(self.file):
+        if getattr(self._batch, 'active', False):
+            if self._batch.data is None:
+                raise Missing("file missing: {0}".format(self.file))
+            return copy.deepcopy(self._batch.data)
+
+        try:
+            st = os.stat(self.file)
+        except OSError:
             raise Missing("file missing: {0}".format(self.file))
 
+        signature = (st.st_mtime, st.st_size, st.st_ino)
+        if self.cache and self._cached:
+            _signature, _data = self._cached
+            if signature == _signature:
+                return copy.deepcopy(_data)
+
         try:
             with self.lock.acquire():
-                return plistlib.readPlist(self.file)
+                data = plistlib.readPlist(self.file)
         except xml.parsers.expat.ExpatError:
             raise ConfigError("corrupted plist: {0}".format(self.file))
 
+        if self.cache and (time.time() - st.st_mtime) > 1:
+            self._cached = (signature, copy.deepcopy(data))
+        return data
+
     # TYPE SPECIFIC FUNCTIONS
     def get(self, key, default=None):
         with self.lock.acquire():
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import logging
+import collections
 from datetime import datetime, timedelta
 
 import config
@@ -29,18 +30,77 @@ class DeviceError(Error):
     pass
 
 
+# device state as read from a single record (see Device.snapshot())
+Snapshot = collections.namedtuple('Snapshot', 
+                                  ['serialnumber', 'erased', 'supervised',
+                                   'verified', 'checkin', 'checkout', 
+                                   'apps', 'background'])
+
+
+def _invalidates(method):
+    """
+    wrap list method to clear DeviceList cached identifiers
+    """
+    def _method(self, *args, **kwargs):
+        self._invalidate()
+        return method(self, *args, **kwargs)
+    _method.__name__ = method.__name__
+    _method.__doc__ = method.__doc__
+    return _method
+
+
 class DeviceList(list):
     """
     convenience class for getting singular property from multiple devices
     at once
+
+    NOTE: ECIDs and UDIDs never change for a device, so they are cached
+          until the list is modified
     """
+    _cache = None
+
+    def _invalidate(self):
+        self._cache = None
+
+    def _identifiers(self):
+        """
+        :returns: dict of cached identifiers (built once per modification)
+        """
+        if self._cache is None:
+            ecids = [x.ecid for x in self]
+            self._cache = {'ecids': ecids,
+                           'udids': [x.udid for x in self],
+                           'ecidset': frozenset(ecids)}
+        return self._cache
+
+    append = _invalidates(list.append)
+    extend = _invalidates(list.extend)
+    insert = _invalidates(list.insert)
+    remove = _invalidates(list.remove)
+    pop = _invalidates(list.pop)
+    sort = _invalidates(list.sort)
+    reverse = _invalidates(list.reverse)
+    __setitem__ = _invalidates(list.__setitem__)
+    __delitem__ = _invalidates(list.__delitem__)
+    __setslice__ = _invalidates(list.__setslice__)
+    __delslice__ = _invalidates(list.__delslice__)
+    __iadd__ = _invalidates(list.__iadd__)
+    __imul__ = _invalidates(list.__imul__)
+
     @property
     def ecids(self):
         """
         :returns: list of device ECIDs
         """
-        return [x.ecid for x in self]
+        return list(self._identifiers()['ecids'])
     
+    @property
+    def ecidset(self):
+        """
+        :returns: frozenset of device ECIDs (for membership tests)
+        """
+        return self._identifiers()['ecidset']
+
     @property
     def serialnumbers(self):
         """
@@ -53,7 +113,7 @@ class DeviceList(list):
         """
         :returns: list of device UDIDs
         """
-        return [x.udid for x in self]
+        return list(self._identifiers()['udids'])
     
     @property
     def names(self):
@@ -90,6 +150,45 @@ class DeviceList(list):
         """
         return DeviceList([x for x in self if not x.supervised])
 
+    def partition_supervised(self):
+        """
+        :returns: tuple of DeviceLists (supervised, unsupervised)
+        """
+        supervised, unsupervised = DeviceList(), DeviceList()
+        for x in self:
+            if x.supervised:
+                supervised.append(x)
+            else:
+                unsupervised.append(x)
+        return supervised, unsupervised
+
+    def set_attr(self, attr, value):
+        """
+        Set the same attribute on every device in the list
+
+        :param string attr:     name of the Device attribute
+        :param value:           value assigned to each device
+
+        :returns: None
+        """
+        self.update(**{attr: value})
+
+    def update(self, **attrs):
+        """
+        Set multiple attributes on every device in the list
+        (each device record is written once)
+
+        EXAMPLE:
+            devices.update(enrolled=now, supervised=True)
+
+        :returns: None
+        """
+        for device in self:
+            # some setters modify multiple keys (e.g. erased)
+            with device.batch():
+                for attr, value in attrs.items():
+                    setattr(device, attr, value)
+
     def __repr__(self):
         """
         'DeviceList(name, name2, ...)'
@@ -115,7 +214,7 @@ class DeviceList(list):
         """
         x.__contains__(y) <==> y.ecid in x.ecids
         """
-        return device.ecid in self.ecids
+        return device.ecid in self._identifiers()['ecidset']
 
 
 class Device(object):
@@ -207,7 +306,14 @@ class Device(object):
         for k, a in _attrmap.items():
             if k in info.keys():
                 setattr(self, a, info[k])
-        self.config.update(info)
+        # info is usually unchanged (e.g. DeviceManager.available())
+        #   only write the record if something is different
+        with self.config.lock.acquire():
+            record = self.config.read()
+            changed = {k: v for k, v in info.items() if record.get(k) != v}
+            if changed:
+                record.update(changed)
+                self.config.write(record)
         
     @property
     def verified(self):
@@ -223,6 +329,37 @@ class Device(object):
     def record(self):
         return self.config.read()
 
+    def batch(self):
+        """
+        Defer record writes until the block exits (single write)
+
+        EXAMPLE:
+            with device.batch():
+                device.restarting = True
+                device.delete('erased')
+
+        :returns: context manager (see config.Manager.batch())
+        """
+        return self.config.batch()
+
+    def snapshot(self):
+        """
+        Read several device attributes at once
+
+        NOTE: missing defaults are not written back to the record
+
+        :returns: Snapshot (namedtuple)
+        """
+        record = self.record
+        return Snapshot(serialnumber=record.get('serialNumber'),
+                        erased=record.get('erased'),
+                        supervised=record.get('isSupervised', False),
+                        verified=record.get('verified', False),
+                        checkin=record.get('checkin'),
+                        checkout=record.get('checkout'),
+                        apps=record.get('installedApps', []),
+                        background=record.get('background'))
+
     @property
     def name(self):
         """
@@ -237,7 +374,7 @@ class Device(object):
             _name = self.config.get('deviceName', _name)
             # default 'iPhone', 'iPad', etc
             if _name and not _name.startswith('i'):
-                self.log.debug('saving name: {0}'.format(_name))
+                self.log.debug('saving name: %s', _name)
                 self.config.update({'name': _name})
             else:
                 _name += " ({0})".format(self.ecid)
@@ -12,6 +12,7 @@ from . import apps
 from . import tasks
 from . import prompt
 from . import config
+from . import utility
 from . import tethering
 from . import resources
 from .device import Device, DeviceList, DeviceError
@@ -30,6 +31,23 @@ __all__ = ['DeviceManager', 'Stopped']
 # suppress "No handlers could be found" message
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 
+# need_to_erase() thresholds
+_ERASE_TIMEOUT = dt.timedelta(minutes=10)
+_CHECKOUT_TIMEOUT = dt.timedelta(minutes=5)
+_CHECKOUT_ADJUSTMENT = dt.timedelta(minutes=1)
+
+# time verified before load balancing (see verify())
+_LOAD_BALANCE_DELAY = dt.timedelta(minutes=5)
+
+
+def _flush_logs():
+    """
+    Flush buffered log records (see utility.LOGGING) at the end of
+    each automation phase
+    """
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+
 
 class Error(Exception):
     pass
@@ -60,6 +78,8 @@ class Cache(object):
     def __init__(self, conf):
         self.log = logging.getLogger(__name__ + '.Cache')
         self.devices = DeviceList()
+        # {ECID: Device} index of self.devices
+        self._by_ecid = {}
         self.conf = conf
 
     @property
@@ -71,30 +91,36 @@ class Cache(object):
         self.conf.update({'Devices': value})
 
     def device(self, ecid):
-        for d in self.devices:
-            if ecid == d.ecid:
-                return d
-        raise CacheError("{0!s}: not in cache".format(ecid))
+        try:
+            return self._by_ecid[ecid]
+        except KeyError:
+            raise CacheError("{0!s}: not in cache".format(ecid))
 
     def add(self, device):
-        if device not in self.devices:
+        if device.ecid not in self._by_ecid:
             self.log.debug("cached device: %s", device)
             self.devices.append(device)
+            self._by_ecid[device.ecid] = device
 
 
 class DeviceManager(object):
     """
     Manage and automate iOS Devices
     """
+    # {directory: (mtime, (key, cert))} shared by all managers
+    _auth_cache = {}
+
     def __init__(self, *args, **kwargs):         
         self.log = logging.getLogger(__name__)
         
-        self.lock = config.FileLock('/tmp/ipadmanager', timeout=5)
+        self.lock = config.ReentrantFileLock('/tmp/ipadmanager', timeout=5)
         self.resources = resources.Resources(__name__)
         
         self.images = self.resources.images
         self.profiles = self.resources.profiles
         self.config = self.resources.config
+        # most reads happen between writes (re-read only when modified)
+        self.config.cache = True
         self.file = self.config.file
         self.cache = Cache(self.config)
 
@@ -109,8 +135,27 @@ class DeviceManager(object):
         
         self._ignored = self.config.setdefault('IgnoredDevices', [])
         self.auth = None
+        # (time, error) of the last failed authorization lookup
+        self._auth_missing = None
         self._install_local_apps = False
 
+        # time.time() of this process' last cfgutil.list()
+        self._listed = 0
+
+        # findall() results (cleared every run and on device changes)
+        self._findall = {}
+
+        # {query: ECIDs} successfully queried since the last device change
+        #   (lets _verify() skip re-querying what run() just queried)
+        self._queried = {}
+
+        # cached (mtime, records(), ECIDs) of all device records
+        self._records = None
+
+        # cached {name: path} of self.images (invalidated by mtime)
+        self._images = None
+        self._images_mtime = None
+
     @property
     def running(self):
         """
@@ -151,7 +196,7 @@ class DeviceManager(object):
         """
         try:
             _managed = device.managed
-            self.log.debug("%s: managed: %s", device, device.managed)
+            self.log.debug("%s: managed: %s", device, _managed)
             return _managed
         except AttributeError:
             self.log.debug("%s: has no managed attribute", device)
@@ -170,24 +215,103 @@ class DeviceManager(object):
         Uses the directory specified to work out the private key
         and certificate files used for cfgutil
         returns ACAuthentication object
+
+        NOTE: the supervision identity is optional (None is returned
+              if the key or certificate is missing)
         """
         if not self.auth:
             self.log.debug("getting authorization for cfgutil")
-            directory = self.resources.supervision
-            
-            if not os.path.isdir(directory):
-                err = "no such directory: {0!r}".format(directory)
+            try:
+                key, cert = self._auth_paths()
+            except Error as e:
+                self.log.debug("no authorization: %s", e)
+                return None
+            self.auth = cfgutil.Authentication(key, cert)
+        return self.auth
+
+    def _required_authorization(self):
+        """
+        Same as authorization(), for actions that can't be performed
+        without the supervision identity (e.g. wallpaper, shutdown)
+
+        :raises: cfgutil.AuthenticationError if the identity is missing
+        """
+        auth = self.authorization()
+        if not auth:
+            err = "missing supervision identity"
+            if self._auth_missing is not None:
+                err = self._auth_missing[1]
+            raise cfgutil.AuthenticationError(err)
+        return auth
+
+    def _auth_paths(self):
+        """
+        Find private key and certificate in the supervision directory
+
+        NOTE: a failed lookup is only re-checked every 5 minutes
+
+        :returns: tuple of paths (key, cert)
+        :raises: Error if either file is missing
+        """
+        if self._auth_missing is not None:
+            checked, err = self._auth_missing
+            if (time.time() - checked) < 300:
                 raise Error(err)
-            key, cert = None, None
+
+        directory = self.resources.supervision
+        # re-use paths found by any manager (unless directory changed)
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            mtime = None
+        cached = self._auth_cache.get(directory)
+        if cached and mtime is not None and cached[0] == mtime:
+            return cached[1]
+
+        key, cert = None, None
+        if os.path.isdir(directory):
             for item in os.listdir(directory):
-                path = os.path.join(directory, item)
                 if item.endswith('.crt'):
-                    cert = path
-                elif item.endswith('.key') or item.endswith('.der'):
-                    key = path
-            if key and cert:
-                self.auth = cfgutil.Authentication(key, cert)
-        return self.auth
+                    cert = os.path.join(directory, item)
+                elif item.endswith(('.key', '.der')):
+                    key = os.path.join(directory, item)
+            missing = []
+            if not key:
+                missing.append('private key')
+            if not cert:
+                missing.append('certificate')
+            err = "missing {0}: {1!r}".format(" and ".join(missing), directory)
+        else:
+            err = "no such directory: {0!r}".format(directory)
+
+        if not (key and cert):
+            self._auth_missing = (time.time(), err)
+            raise Error(err)
+        self._auth_missing = None
+        self._auth_cache[directory] = (mtime, (key, cert))
+        return key, cert
+
+    def _scan_records(self):
+        """
+        :returns: tuple (mtime, [(ECID, path), ...], frozenset(ECIDs))
+        """
+        directory = self.resources.devices
+        # only re-scan the directory if it has been modified
+        cached = self._records
+        rescan, mtime = utility.modified(directory, 
+                                         cached[0] if cached else None)
+        if rescan:
+            _all = []
+            # list all files in directory (excluding hidden files)
+            for f in os.listdir(directory):
+                if f.endswith('.plist') and not f.startswith('.'):
+                    # remove '.plist' extension
+                    _ecid = intern(str(f[:-6]))
+                    # append tuple (ECID, path)
+                    _all.append((_ecid, f))
+            known = frozenset(e for e, f in _all)
+            self._records = cached = (mtime, _all, known)
+        return cached
 
     def records(self, ecids=None):
         """
@@ -195,33 +319,46 @@ class DeviceManager(object):
             if no ECIDs are specified, returns all device records
             e.g. [(ECID1, path), (ECID2, path), ...]
         """
-        # list all files in directory (excluding hidden files)
-        files = [x for x in os.listdir(self.resources.devices)
-                 if not x.startswith('.')]
-        _records = []
-        ecids = ecids or []
-        for f in files:
-            if f.endswith('.plist'):
-                # remove '.plist' extension
-                _ecid = os.path.splitext(f)[0]
-                # return only specified ECIDs or everything
-                if not ecids or _ecid in ecids:
-                    # append tuple (ECID, path)
-                    _records.append((_ecid, f))
-        return _records
+        _all = self._scan_records()[1]
+        # return only specified ECIDs or everything
+        if not ecids:
+            return list(_all)
+        ecids = set(ecids)
+        return [r for r in _all if r[0] in ecids]
+
+    def _known_ecids(self):
+        """
+        :returns: frozenset of ECIDs with existing device records
+        """
+        return self._scan_records()[2]
 
     def findall(self, ecids=None, exclude=()):
         """
         :returns: DeviceList of specified ECIDs
 
         if no ECIDs are specified, return DeviceList for all known devices
+
+        NOTE: results are memoized until the next run() or _verify()
+              (or until a device is checked in, checked out, or created)
         """
+        # frozenset(x) is x when exclude is already a frozenset
+        key = (frozenset(ecids) if ecids else None, frozenset(exclude))
+        try:
+            return DeviceList(self._findall[key])
+        except KeyError:
+            pass
+
+        # records() already limits results to specified ECIDs
+        exclude = key[1]
+        records = self.records(ecids)
+        # every ECID found has a record (no need to re-check each one)
+        known = frozenset(e for e, p in records)
         devices = DeviceList()
-        for ecid, path in self.records(ecids):
+        for ecid, path in records:
             if ecid not in exclude:
-                if not ecids or ecid in ecids:
-                    devices.append(self.device(ecid))
-        return devices
+                devices.append(self.device(ecid, known=known))
+        self._findall[key] = devices
+        return DeviceList(devices)
 
     def available(self):
         """
@@ -234,12 +371,18 @@ class DeviceManager(object):
         """
         :returns: DeviceList of non-connected devices
         """
-        return self.findall(exclude=self.available().ecids)
+        return self.findall(exclude=self.available().ecidset)
 
-    def device(self, ecid, info=None):
+    def device(self, ecid, info=None, known=None):
         """
+        :param known:   ECIDs with existing device records
+                            (default: checks the records directory)
+
         :returns: Device object
+
+        NOTE: ECIDs are interned (as str) to speed up cache lookups
         """
+        ecid = intern(str(ecid))
         try:
             # return cached device object (if we have one)
             _device = self.cache.device(ecid)
@@ -252,10 +395,13 @@ class DeviceManager(object):
         self.log.debug("creating new device object: %s", ecid)
 
         # check if we have an existing device record
-        # if ecid not in [e for e,p in self.records()]:
-        if ecid not in [x[0] for x in self.records()]:
+        if known is None:
+            known = self._known_ecids()
+        if ecid not in known:
             self.log.info("creating new device record: %s", ecid)
             self.task.query('serialNumber', [ecid])
+            # new record invalidates any previous findall() results
+            self._findall.clear()
 
         device = Device(ecid, info, path=self.resources.devices)
 
@@ -270,22 +416,43 @@ class DeviceManager(object):
         :returns: list of connected devices using cfgutil.list()
 
         NOTE: cached and refreshed once every 30 seconds
+              (not refreshed while stopped, unless specified)
         """
         # keep listing down to once per 30 seconds (and first run)
         now = dt.datetime.now()
         # set refresh to <timeout> seconds ago
         expires = now -  dt.timedelta(seconds=timeout)
-        # default listed == refresh (triggering update)
-        listed = self.config.setdefault('lastListed', expires)
-        if refresh or listed <= expires:
-            # update the cache and record the timestamp
-            self.log.debug("refreshing device list")
-            self.cache.listed = cfgutil.list()
+        if not refresh:
+            # optimistic check: a single read without holding the lock
+            #   (it is only held while the file is parsed, and not at all
+            #    if the file hasn't changed since the last read)
+            record = self.config.read()
+            listed = record.get('Devices', [])
+            # skip the timestamp check if this process listed recently
+            elapsed = time.time() - self._listed
+            if 0 <= elapsed < timeout:
+                return listed
+            # nothing will be automated while stopped
+            if listed and record.get('Stopped', False):
+                self.log.debug("stopped: using cached device list")
+                return listed
+            # another process may have listed recently
+            if record.get('lastListed', expires) > expires:
+                return listed
+
+        # update the cache and record the timestamp
+        self.log.debug("refreshing device list")
+        devices = cfgutil.list()
+        with self.config.batch():
+            self.cache.listed = devices
             self.config.update({'lastListed': now})
-        return self.cache.listed
+        self._listed = time.time()
+        return devices
 
-    def need_to_erase(self, device):
+    def need_to_erase(self, device, now=None):
         """
+        :param now:     datetime to compare against (default: now)
+
         :returns: True if device needs to be erased
         """
         self.log.info("%s: checking erase", device)
@@ -300,21 +467,28 @@ class DeviceManager(object):
             self.log.debug("%s: restarting", device)
             return False
         
+        # read timestamps at once (record is not modified below until
+        # the device checkout is adjusted)
+        snapshot = device.snapshot()
+        checkin = snapshot.checkin
+        checkout = snapshot.checkout
+
         # device has NEVER checked in (erase)
-        if not device.checkin:
+        if not checkin:
             self.log.debug("%s: new device found!", device)
             return True
 
         # device has not been erased (erase)
-        if not device.erased:
+        if not snapshot.erased:
             self.log.debug("%s: never erased", device)
             return True
 
-        now = dt.datetime.now()
+        if now is None:
+            now = dt.datetime.now()
 
         # device has been erased in the last 10 minutes (don't erase)
-        was_erased = now - device.erased
-        if was_erased <  dt.timedelta(minutes=10):
+        was_erased = now - snapshot.erased
+        if was_erased < _ERASE_TIMEOUT:
             self.log.info("%s: recently erased", device)
             self.verified = False
             return False
@@ -324,18 +498,18 @@ class DeviceManager(object):
         # This is where things get messy
         try:
             # if the device has been checked out since last checkin
-            if device.checkout > device.checkin:
+            if checkout > checkin:
                 # see if checkout happened less than 5 minutes ago
                 self.log.debug("%s: was checked out", device)
-                time_away = now - device.checkout
+                time_away = now - checkout
                 self.log.debug("%s: checked out for: %s", device, time_away)
-                if time_away >  dt.timedelta(minutes=5):
+                if time_away > _CHECKOUT_TIMEOUT:
                     self.log.debug("%s: valid checkout", device)
                     return True
                 else:
                     # reset checkout to 1 minute before last checkin
                     self.log.debug("%s: invalid checkout", device)
-                    recover = device.checkin -  dt.timedelta(minutes=1)
+                    recover = checkin - _CHECKOUT_ADJUSTMENT
                     self.log.debug("adjusted checkout: %s", recover)
                     device.checkout = recover
                     self.log.debug("invalidating verification")
@@ -345,7 +519,7 @@ class DeviceManager(object):
         except TypeError:
             self.log.debug("%s: never checked out", device)
             # create dummy checkout 1 minute before checkin
-            device.checkout = device.checkin -  dt.timedelta(minutes=1)
+            device.checkout = checkin - _CHECKOUT_ADJUSTMENT
         
         return False
 
@@ -368,17 +542,8 @@ class DeviceManager(object):
         if _use_tethering and enabled:
             self.log.debug("using tethering")
             sns = devices.serialnumbers
-            tethered = tethering.devices_are_tethered(sns)
-            timeout = dt.datetime.now() +  dt.timedelta(seconds=10)
-
-            while not tethered:
-                time.sleep(5)
-                tethered = tethering.devices_are_tethered(sns)
-                if dt.datetime.now() > timeout:
-                    self.log.error("timed out waiting for devices")
-                    break
-
-            if not tethered:
+            if not tethering.wait_tethered(sns, timeout=10):
+                self.log.error("timed out waiting for devices")
                 tethering.restart(timeout=10)
         else:
             # too hidden for my liking, but whatever
@@ -409,6 +574,7 @@ class DeviceManager(object):
         """
         # update cache (add to cached list)
         self.cache.listed = self.cache.listed + [info]
+        self._findall.clear()
 
         device = self.device(info['ECID'], info)
         device.verified = False
@@ -460,7 +626,8 @@ class DeviceManager(object):
                 device.restarting = False
 
         # Determine actions need to be taken
-        if self.need_to_erase(device):
+        now = dt.datetime.now()
+        if self.need_to_erase(device, now):
             self.log.debug("%s: will be erased", device)
             self.task.erase([device.ecid])
             self.task.query('installedApps', [device.ecid])
@@ -468,7 +635,7 @@ class DeviceManager(object):
             self.log.debug("%s: will not be erased", device)
         
         # at this point all checks have been made and
-        device.checkin = dt.datetime.now()
+        device.checkin = now
         
         if run:
             self.run()
@@ -484,6 +651,7 @@ class DeviceManager(object):
         device = self.device(info['ECID'], info)
         _cache = [d for d in self.cache.listed if d['ECID'] != device.ecid]
         self.cache.listed = _cache
+        self._findall.clear()
         
         if self.ignored(device):
             self.log.info("checkout ignored: %s", device)
@@ -493,14 +661,16 @@ class DeviceManager(object):
         # IDEA: could just return if self.stopped (would eliminate need
         #       for device restart tracking)
 
-        # skip checkout if device has been marked for restart
-        if not device.restarting:
-            device.checkout = dt.datetime.now()
-            self.log.info("%s: checked out", device)
-        else:
-            self.log.debug("%s: restarting...", device)
+        # device record changes are written at once
+        with device.batch():
+            # skip checkout if device has been marked for restart
+            if not device.restarting:
+                device.checkout = dt.datetime.now()
+                self.log.info("%s: checked out", device)
+            else:
+                self.log.debug("%s: restarting...", device)
 
-        device.verified = False
+            device.verified = False
 
     def waitfor(self, device, reason, wait=120):
         """
@@ -513,7 +683,7 @@ class DeviceManager(object):
             self.stopped = False
             return
 
-        self.log.debug("instructed to wait for: {0}".format(reason))
+        self.log.debug("instructed to wait for: %s", reason)
         if reason != self.config.get(_reason):
             raise Stopped("not stopped for: {0}".format(reason))
 
@@ -523,7 +693,7 @@ class DeviceManager(object):
 
         # this should block all devices until the stopped reason
         # has passed
-        self.log.debug("waiting for: {0}".format(reason))
+        self.log.debug("waiting for: %s", reason)
         lockfile = '/tmp/ipad-{0}.lock'.format(reason)
         lock = config.FileLock(lockfile)
         with lock.acquire(timeout=-1):
@@ -534,15 +704,15 @@ class DeviceManager(object):
                     self.config.delete(_reason)
                 return
 
-            stoptime = dt.datetime.now() +  dt.timedelta(seconds=wait)
-            while waiting:
-                time.sleep(5)
-                msg = "waiting on {0}: {1}".format(reason, waiting)
-                self.log.debug(msg)
+            def _finished():
                 waiting = self.task.list(reason)
-                if dt.datetime.now() > stoptime:
-                    self.log.debug("gave up waiting")
-                    break
+                if waiting:
+                    self.log.debug("waiting on %s: %s", reason, waiting)
+                return not waiting
+
+            # poll quickly at first, backing off to every 5 seconds
+            if not utility.poll_until(_finished, wait):
+                self.log.debug("gave up waiting")
             self.stopped = False
             self.config.delete(_reason)
 
@@ -551,21 +721,28 @@ class DeviceManager(object):
         Run tasked queries using actools.cfgutil
         """
         self.log.info("running device queries...")
-        if not self.task.queries():
+        pending = self.task.queries()
+        if not pending:
             self.log.info("no queries to perform")
             return
         
-        available = self.available().ecids
+        # hashed once for every query below
+        available = set(self.available().ecids)
         # Temporary cache of existing queries
-        _cache, ecidset = {}, set()
+        _cache = {}
+        # same queries by ECID {ECID: [query, ...]}
+        _by_ecid = {}
         # merge all of the queries into one
-        for q in self.task.queries():
+        for q in pending:
             # empty the query of all ECIDs (preserved in _cache)
             ecids = self.task.query(q, only=available)
             if ecids:
-                _cache[q] = ecids
-                # create a set of all unique ECIDs
-                ecidset.update(_cache[q])
+                # sets make removing successful queries O(1)
+                _cache[q] = set(ecids)
+                for ecid in ecids:
+                    _by_ecid.setdefault(ecid, []).append(q)
+        # create a set of all unique ECIDs
+        ecidset = set(_by_ecid)
 
         if not _cache:
             self.log.debug("no queries for available devices")
@@ -580,65 +757,85 @@ class DeviceManager(object):
             self.log.debug("result: %r", result.output)
         except Exception:
             self.log.exception("unable to query devices")
-            for q, ecids in _cache.items():
-                self.log.debug('re-building queries: %r: %r', q, ecids)
-                self.task.query(q, ecids)
+            self.log.debug('re-building queries: %r', _cache)
+            self.task.query_many(_cache)
             raise
         
         # Process results
+        # ECIDs that were queried for installedApps (before removal)
+        app_query = set(_cache.get('installedApps', ()))
 
         # all devices that were specified in the combined query
-        for device in self.devices(ecidset):
+        devices = self.devices(ecidset)
+        for device in devices:
             # get all information returned for this device
             info = result.get(device.ecid, {})
-            if info:
-                # iterate the cache to find queries for this device
-                for q, ecids in _cache.items():
-                    # NOTE: may only update the key that was queried
-                    #       ... might be beneficial to update all keys?
-                    #       ... would be side effect...
-                    if device.ecid in ecids:
-                        # get the value of the query result
-                        v = info.get(q)
-                        if v is not None:
-                            device.update(q, v)
-                            # remove successful queries from the cache
-                            ecids.remove(device.ecid)
-                        else:
-                            # err = "missing query result: {0!r}: {1!r}"
-                            # self.log.error(err.format(q, device.name))
-                            self.log.error("missing query: %r: %s", q, device)
-
-                    # TO-DO: should be handled elsewhere and not buried here
-                    if q == 'installedApps':
-                        # find and report any unknown apps
-                        new = self.apps.unknown(device)
-                        # only report if new apps were found
-                        if new:
-                            # TO-DO: design mechanism for tracking repeat installations
-                            msg = u"NEW: {0!s}: {1!s}".format(device, new)
-                            self.log.info(msg)
-                            self.reporter.send(msg)
-                        else:
-                            # _msg = "{0!s}: no unknown apps found"
-                            # self.log.debug(_msg.format(device))
-                            self.log.debug("%s: no unknown apps", device)
-
-            else:
+            if not info:
                 self.log.error("missing results for: %s", device)
+                continue
+            # only the queries for this device
+            updates = {}
+            for q in _by_ecid[device.ecid]:
+                # NOTE: may only update the key that was queried
+                #       ... might be beneficial to update all keys?
+                #       ... would be side effect...
+                # get the value of the query result
+                v = info.get(q)
+                if v is not None:
+                    updates[q] = v
+                    # remove successful queries from the cache
+                    _cache[q].discard(device.ecid)
+                    # remember successful queries (see _verify())
+                    self._queried.setdefault(q, set()).add(device.ecid)
+                else:
+                    self.log.error("missing query: %r: %s", q, device)
+            if updates:
+                # all query results written to the record at once
+                device.updateall(updates)
+
+        # TO-DO: should be handled elsewhere and not buried here
+        if app_query:
+            # only devices with updated installedApps
+            updated = app_query - _cache['installedApps']
+            if updated:
+                self._report_unknown_apps(d for d in devices 
+                                          if d.ecid in updated)
 
         # cache should only be made up of failed (or un-run)
         # queries at this point
         # TO-DO: test cache removes successful queries
-        for q, ecids in _cache.items():
-            if ecids:
-                msg = "run_queries: re-tasking query: {0!r}: {1!r}"
-                self.log.debug(msg.format(q, ecids))
-                self.task.query(q, ecids)
+        _failed = {q: ecids for q, ecids in _cache.items() if ecids}
+        if _failed:
+            self.log.debug("run_queries: re-tasking queries: %r", _failed)
+            self.task.query_many(_failed)
 
         # forward along the results for processing elsewhere
         return result
 
+    def _report_unknown_apps(self, devices):
+        """
+        Find and report any unknown apps (sent as a single report)
+
+        :param devices:     iterable of Devices
+        :returns: None
+        """
+        # scoped apps are only needed once
+        known = frozenset(self.apps.list())
+        reports = []
+        for device in devices:
+            new = self.apps.unknown(device, known=known)
+            # only report if new apps were found
+            if new:
+                # TO-DO: design mechanism for tracking repeat installations
+                msg = u"NEW: {0!s}: {1!s}".format(device, new)
+                self.log.info(msg)
+                reports.append(msg)
+            else:
+                self.log.debug("%s: no unknown apps", device)
+        if reports:
+            # one message instead of one per device
+            self.reporter.send(u"\n".join(reports))
+
     def erase(self, targets):
         """
         Erase devices and task for supervision and App installation
@@ -653,7 +850,8 @@ class DeviceManager(object):
             return
 
         # get subset of managed ECIDs that need to be erased
-        managed_ecids = [e for e in tasked_ecids if e not in self.ignored()]
+        ignored = set(self.ignored())
+        managed_ecids = [e for e in tasked_ecids if e not in ignored]
         if not managed_ecids:
             self.log.debug("ignored ecids tasked for erase: %r", tasked_ecids)
             self.log.info("skipping ignored devices")
@@ -661,13 +859,16 @@ class DeviceManager(object):
 
         # update device record before erase (or will count as checkout)
         tasked = self.devices(managed_ecids)
+        # previous query results are about to be stale
+        self._queried.clear()
         for device in tasked:
-            if self.ignored(device):
+            if device.ecid in ignored:
                 self.log.error("ignored device was tasked for erase")
                 continue
             self.log.debug("erase: found device: %s", device)
-            device.restarting = True
-            device.delete('erased')
+            with device.batch():
+                device.restarting = True
+                device.delete('erased')
         
         erased = []
         failed = []
@@ -699,16 +900,14 @@ class DeviceManager(object):
             # if nothing was erased, then everything failed
             if not erased:
                 self.log.error("erased failed for all devices")
-                self.log.debug("failed devices: {0}".format(tasked))
+                self.log.debug("failed devices: %s", tasked)
                 failed = tasked
             if failed:
-                names = failed.names
-                self.log.error("erase failed: {0}".format(names))
+                self.log.error("erase failed: %s", failed)
                 self.task.erase(failed.ecids)
-                self.log.debug("re-tasked: {0!s}".format(failed))
+                self.log.debug("re-tasked: %s", failed)
                 # un-mark failed devices as restarting
-                for d in devices:
-                    d.restarting = False
+                failed.set_attr('restarting', False)
             else:
                 self.log.debug("all devices were successfully erased!")
                 
@@ -718,17 +917,22 @@ class DeviceManager(object):
                 # task devices for supervision and app installation
                 self.task.prepare(erased.ecids)
                 
+                # app scope only depends on the model (see apps.groups())
+                scoped = {}
+                _installapps = []
                 for device in erased:
-                    _installapps = self.apps.list(device)
-                    if _installapps:
-                        self.task.installapps([device.ecid])
+                    if device.model not in scoped:
+                        scoped[device.model] = bool(self.apps.list(device))
+                    if scoped[device.model]:
+                        _installapps.append(device.ecid)
                     else:
                         self.log.info("no apps to install for %s", device)
+                # NOTE: task.installapps() without ECIDs would get tasks
+                if _installapps:
+                    self.task.installapps(_installapps)
                         
-                now = dt.datetime.now()
-                for device in erased:
-                    device.erased = now
-                    
+                erased.set_attr('erased', dt.datetime.now())
+
                 self.task.add('restart', erased.ecids)
                 self.stop(reason='restart')
                 
@@ -752,7 +956,8 @@ class DeviceManager(object):
             return
 
         # get subset of managed ECIDs that need to be erased
-        managed_ecids = [e for e in tasked_ecids if e not in self.ignored()]
+        ignored = set(self.ignored())
+        managed_ecids = [e for e in tasked_ecids if e not in ignored]
         if not managed_ecids:
             self.log.debug("ignored ecids tasked for erase: %r", tasked_ecids)
             self.log.info("skipping ignored devices")
@@ -760,6 +965,8 @@ class DeviceManager(object):
 
         # make sure device network checks out
         tasked = self.devices(managed_ecids)
+        # previous query results are about to be stale
+        self._queried.clear()
         try:
             self.check_network(tasked, tethered=True)
         except tethering.Error:
@@ -794,7 +1001,7 @@ class DeviceManager(object):
             elif e.detail == "Network communication error.":
                 self.log.debug("Network unavailable")
             else:
-                self.log.exception("unexpected fatal error", e)
+                self.log.exception("unexpected fatal error: %s", e)
                 self.log.error(e.detail)
                 raise
 
@@ -814,10 +1021,8 @@ class DeviceManager(object):
             #   during verification
             if prepared:
                 self.log.info("successfully supervised: %s", prepared)
-                for device in prepared:
-                    # not sure this is being used anymore
-                    device.enrolled = dt.datetime.now()
-                    device.supervised = True
+                # not sure 'enrolled' is being used anymore
+                prepared.update(enrolled=dt.datetime.now(), supervised=True)
                 
                 # tethering now requires device restart (weird behaviour)
                 # if tethering.enabled():
@@ -833,11 +1038,13 @@ class DeviceManager(object):
         :param DeviceList targets:  devices to restart
         :returns: None
         """
+        # don't mark devices as restarting if they can't be restarted
+        auth = self._required_authorization()
         self.log.info("restarting devices: %s", devices)
         self.task.add('restart', devices.ecids)
         for device in devices:
             device.restarting = True
-        cfgutil.restart(devices.ecids, self.authorization())
+        cfgutil.restart(devices.ecids, auth)
         self.stop(reason='restart')
 
     def shutdown(self, devices):
@@ -849,7 +1056,7 @@ class DeviceManager(object):
         """
         if devices:
             self.log.info("shutting down devices: %s", devices)
-            cfgutil.shutdown(devices.ecids, self.authorization())
+            cfgutil.shutdown(devices.ecids, self._required_authorization())
         else:
             self.log.debug("no devices specified")
 
@@ -871,13 +1078,16 @@ class DeviceManager(object):
             return
 
         # get subset of managed ECIDs that need to be erased
-        managed_ecids = [e for e in tasked_ecids if e not in self.ignored()]
+        ignored = set(self.ignored())
+        managed_ecids = [e for e in tasked_ecids if e not in ignored]
         if not managed_ecids:
             self.log.debug("ignored ecids: %r", tasked_ecids)
             self.log.info("skipping ignored devices")
             return
 
         tasked = self.devices(managed_ecids)
+        # previous query results are about to be stale
+        self._queried.clear()
 
         # Hacky hook (until something better can be figured out)
         if self._install_local_apps:
@@ -921,36 +1131,53 @@ class DeviceManager(object):
             self.log.error("no images available")
             return
 
-        if targets.unsupervised:
+        tasked, unsupervised = targets.partition_supervised()
+        if unsupervised:
             err = "cannot modify wallpaper for unsupervised devices"
-            self.log.error(err + ": %s", targets.unsupervised)
+            self.log.error(err + ": %s", unsupervised)
 
         # background cannot be set on unsupervised devices
-        tasked = targets.supervised
         if not tasked:
             self.log.error("no wallpapers modified")
             return
 
-        images = {}
-        for image in os.listdir(self.images):
-            name, ext = os.path.splitext(image)
-            if ext in ['.png', '.jpeg', '.jpg']:
-                path = os.path.join(self.images, image)
-                images[name] = path
-        
+        # only re-scan the images directory if it has been modified
+        rescan, mtime = utility.modified(self.images, self._images_mtime)
+        if self._images is None or rescan:
+            self.log.debug("scanning images: %r", self.images)
+            images = {}
+            for image in os.listdir(self.images):
+                if image.endswith(('.png', '.jpeg', '.jpg')):
+                    name = os.path.splitext(image)[0]
+                    images[name] = os.path.join(self.images, image)
+            self._images = images
+            self._images_mtime = mtime
+
+        # wallpaper can't be set without the supervision identity
+        auth = self._required_authorization()
         try:
-            image = images[_type]
-            result = cfgutil.wallpaper(tasked.ecids, image,
-                                       self.authorization())
-            for device in self.devices(result.ecids):
-                device.background = _type
+            image = self._images[_type]
+            result = cfgutil.wallpaper(tasked.ecids, image, auth)
+            # reuse the device objects we already have
+            succeeded = set(result.ecids)
+            modified = DeviceList([d for d in tasked if d.ecid in succeeded])
+            modified.set_attr('background', _type)
+        except cfgutil.AuthenticationError:
+            # force authorization to be looked up again
+            self.auth = None
+            self._auth_missing = None
+            raise
         except cfgutil.CfgutilError as e:
             self.log.exception("failed to set background: %s", tasked)
             self.log.debug("unaffected: %s", e.unaffected)
             self.log.debug("affected: %s", e.affected)
+            # record wallpapers that were set (or they'd be set again)
+            unaffected = set(e.unaffected)
+            modified = DeviceList([d for d in tasked if d.ecid in unaffected])
+            modified.set_attr('background', _type)
             raise
         except KeyError as e:
-            self.log.error("no image for: {0}".format(e))
+            self.log.error("no image for: %s", e)
             return
 
     def load_balance(self):
@@ -1002,6 +1229,16 @@ class DeviceManager(object):
             _data['verification'] = dt.datetime.now()
         self.config.update(_data)
     
+    def _finished_recently(self, seconds=60):
+        """
+        :returns: True if automation was finalized within `seconds`
+        """
+        last_run = self.config.get('finished')
+        if not last_run:
+            return False
+        elapsed = dt.datetime.now() - last_run
+        return elapsed < dt.timedelta(seconds=seconds)
+
     def _verify(self):
         """
         Run significant verification
@@ -1012,18 +1249,28 @@ class DeviceManager(object):
               relatively well for now
         """
         self.log.debug("running significant verification")
-        
+        self._findall.clear()
+
         # get all available, managed devices
-        available = DeviceList([d for d in self.available() if d.managed])
+        connected = self.available()
+        available = DeviceList([d for d in connected if d.managed])
 
         # Re-query supervision and apps on all available devices
-        self.task.query('installedApps', available.ecids)
-        self.task.query('isSupervised', available.ecids)
+        #   (unless they were just queried and nothing has changed since)
+        requery = {}
+        for q in ('installedApps', 'isSupervised'):
+            requery[q] = set(available.ecids)
+            requery[q].difference_update(self._queried.get(q, ()))
+        self._queried.clear()
+        self.task.query_many(requery)
         self.run_queries()
         
         now = dt.datetime.now()
         retask = {}
+        missing_serials = []
         app_check = DeviceList()
+        # scoped apps don't change during verification
+        known_apps = frozenset(self.apps.list())
         for device in available:
             _verified = True
             self.log.info("verifying: %s", device)
@@ -1032,14 +1279,17 @@ class DeviceManager(object):
             if not device.serialnumber:
                 _verified = False
                 self.log.error('%s: missing serial number', device)
-                self.task.query('serialNumber', [device.ecid])
+                missing_serials.append(device.ecid)
             else:
                 self.log.debug('%s: has serial number!', device)
 
+            # read remaining state at once
+            snapshot = device.snapshot()
+
             # verify device was erased
-            unknown_apps = self.apps.unknown(device)
-            if not device.erased or unknown_apps:
-                if not device.erased:
+            unknown_apps = self.apps.unknown(device, known=known_apps)
+            if not snapshot.erased or unknown_apps:
+                if not snapshot.erased:
                     self.log.error("%s: never erased...", device)
                 elif unknown_apps:
                     self.log.error("%s: unknown apps found...", device)
@@ -1054,7 +1304,7 @@ class DeviceManager(object):
                 app_check.append(device)
                 
             # verify device supervision
-            if not device.supervised:
+            if not snapshot.supervised:
                 if os.path.exists(self.resources.wifi):
                     _verified = False
                     _enrolltask = retask.setdefault('prepare', [])
@@ -1067,26 +1317,34 @@ class DeviceManager(object):
             self.log.debug("%s: verified == %s", device, _verified)
             device.verified = _verified
 
+        # re-query missing serial numbers at once
+        if missing_serials:
+            self.task.query('serialNumber', missing_serials)
+
         # App Verification
-        missing_apps = []
-        try:
-            missing_apps = self.apps.verify(app_check)
-            if missing_apps:
-                self.log.debug("found missing apps: %r", missing_apps)
-                self.log.debug("ecids: %r", missing_apps.ecids)
-                retask['installapps'] = missing_apps.ecids
-        except apps.SkipVerification as e:
-            self.log.error("unable to verify apps: %s", e)
-            self.reporter.send(e)
-            # re-check verification, but don't re-task app installation
-            missing_apps = self.apps.verify(app_check, force=True)
-        finally:
-            for d in missing_apps:
-                d.verified = False
+        missing_apps = DeviceList()
+        if not app_check:
+            # nothing to verify (and no app errors should be reset)
+            self.log.debug("no devices need app verification")
+        else:
+            try:
+                missing_apps = self.apps.verify(app_check)
+                if missing_apps:
+                    self.log.debug("found missing apps: %r", missing_apps)
+                    self.log.debug("ecids: %r", missing_apps.ecids)
+                    retask['installapps'] = missing_apps.ecids
+            except apps.SkipVerification as e:
+                self.log.error("unable to verify apps: %s", e)
+                self.reporter.send(e)
+                # re-check verification, but don't re-task app installation
+                missing_apps = self.apps.verify(app_check, force=True)
+            finally:
+                missing_apps.set_attr('verified', False)
                 
         # sanitize unavailable devices
         unavailable = DeviceList()
-        for device in self.unavailable():
+        # same as self.unavailable() without re-listing connected devices
+        for device in self.findall(exclude=connected.ecidset):
             if device.restarting:
                 # ignore restarting devices
                 self.log.info("%s: currently restarting", device)
@@ -1098,21 +1356,23 @@ class DeviceManager(object):
                 device.checkout = now
             unavailable.append(device)
         
-        skipped_ecids = unavailable.ecids + self.ignored()
+        skipped_ecids = set(unavailable.ecids)
+        skipped_ecids.update(self.ignored())
         self.task.remove(skipped_ecids)
 
         # Re-Task Devices
         _verified = True
         self.log.debug("retasking: %r", retask)
+        _retasked = {}
         for name, ecids in retask.items():
             # if any tasks have to be added then verification failed
             retasked = set(ecids).difference(skipped_ecids)
-            self.log.debug("retasked: %r", retasked)
             if retasked:
                 _verified = False
                 self.log.debug("restasking: %r, %r", name, retasked)
-                self.task.add(name, retasked)
-                self.log.debug("retasked: %r, %r", name, retasked)
+                _retasked[name] = retasked
+        # write all tasks at once
+        self.task.add_many(_retasked)
         
         self.log.debug("all devices verified: %s", _verified)
         return _verified
@@ -1123,23 +1383,34 @@ class DeviceManager(object):
         runs more significant verification as necessary
         """
         with self.lock.acquire(timeout=-1):
-            if self.stopped:
-                # TO-DO: is there a reason I'm not raising Stopped()?
-                # raise Stopped("verification")
-                self.log.info("verification stopped")
-                return
-            
-            # not sure what this does anymore, but removing it created
-            # some odd behaviour
-            last_run = self.config.get('finished')
-            if last_run:
-                _seconds = (dt.datetime.now() - last_run).seconds
-                if _seconds < 60:
-                    self.log.debug("ran less than 1 minute ago...")
-                    return
+            # query results from another run() may be stale
+            self._queried.clear()
+            try:
+                self._verify_locked(run)
+            finally:
+                _flush_logs()
 
-            self.log.info("verifying automation")
+    def _verify_locked(self, run=False):
+        """
+        Same as verify(), but assumes self.lock is already held
+        (e.g. from within run())
+        """
+        if self.stopped:
+            # TO-DO: is there a reason I'm not raising Stopped()?
+            # raise Stopped("verification")
+            self.log.info("verification stopped")
+            return
+        
+        # not sure what this does anymore, but removing it created
+        # some odd behaviour
+        if self._finished_recently():
+            self.log.debug("ran less than 1 minute ago...")
+            return
 
+        self.log.info("verifying automation")
+
+        # write verification state changes back at once
+        with self.config.batch():
             # Check for pending queries
             if self.task.queries():
                 self.log.debug("found pending queries")
@@ -1155,29 +1426,30 @@ class DeviceManager(object):
                 self.verified = False
             else:
                 self.log.debug("all tasks completed!")
-                
-            # Check verification status
-            if not self.verified:
-                self.verified = self._verify()
-        
-            # re-check verification after self._verify()
-            if not self.verified:
-                self.log.info("verification failed...")
-                if run:
-                    self.log.debug("running automation")
-                    self.run()
+            _verified = self.verified
+
+        # Check verification status
+        if not _verified:
+            self.verified = self._verify()
+    
+        # re-check verification after self._verify()
+        if not self.verified:
+            self.log.info("verification failed...")
+            if run:
+                self.log.debug("running automation")
+                self.run()
+        else:
+            self.log.info("all devices and tasks were verified!")
+            # attempt to keep load balancing from happening too quickly
+            # after app installation
+            now = dt.datetime.now()
+            timestamp = self.config.get('verification', now)
+            vtimedelta = now - timestamp
+            self.log.debug("verified for: %s", vtimedelta)
+            if vtimedelta > _LOAD_BALANCE_DELAY:
+                self.load_balance()
             else:
-                self.log.info("all devices and tasks were verified!")
-                # attempt to keep load balancing from happening too quickly
-                # after app installation
-                now = dt.datetime.now()
-                timestamp = self.config.get('verification', now)
-                vtimedelta = now - timestamp
-                self.log.debug("verified for: %s", vtimedelta)
-                if vtimedelta > dt.timedelta(minutes=5):
-                    self.load_balance()
-                else:
-                    self.log.debug("load balancing skipped")
+                self.log.debug("load balancing skipped")
 
     def finalize(self):
         """
@@ -1188,8 +1460,8 @@ class DeviceManager(object):
         if self.stopped:
             raise Stopped("finalization")
 
-        # run verification
-        self.verify()
+        # run verification (run() already holds self.lock)
+        self._verify_locked()
         
         # Check tasks for any re-tasked devices
         _retasked = set()
@@ -1231,6 +1503,8 @@ class DeviceManager(object):
         #   (will be changed in future version)
         with self.lock.acquire(timeout=-1):
             self.log.info("running automation")
+            self._findall.clear()
+            self._queried.clear()
             if self.stopped:
                 self.log.info("automation stopped")
                 return
@@ -1250,6 +1524,14 @@ class DeviceManager(object):
                         # only print tasks that are on the agenda
                         self.log.info("tasked: %s: %s", k, v)
 
+            # skip automation (and the delay) if nothing is on the agenda
+            pending = self.task.pending_summary()
+            if not any(pending.values()) and not self.task.queries():
+                self.log.info("nothing tasked")
+                self.finalize()
+                self.log.info("finished")
+                return
+
             # Pre-Automation (queries)
             # give lagging devices a chance to catch up
             time.sleep(5)
@@ -1261,10 +1543,12 @@ class DeviceManager(object):
             # Automation
             try:
                 self.erase(devices)
+                _flush_logs()
                 try:
                     self.supervise(devices)
                 except SkipSupervision:
                     self.log.info("supervision skipped")
+                _flush_logs()
                 self.installapps(devices)
             except Stopped as e:
                 self.log.info(e)
@@ -1272,10 +1556,13 @@ class DeviceManager(object):
             except:
                 self.log.exception("unexpected error occurred")
                 raise
+            finally:
+                _flush_logs()
 
             # Finalization
             self.finalize()
             self.log.info("finished")
+            _flush_logs()
 
 
 if __name__ == '__main__':
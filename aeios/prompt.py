@@ -49,8 +49,8 @@ class Button(object):
         
     def __init__(self, text, callback=None, default=False):
         self.log = logging.getLogger(__name__ + '.Button')
-        _msg = "initializing Button({0!r}, {1!r}, {2!r})"
-        self.log.debug(_msg.format(text, callback, default))
+        self.log.debug("initializing Button(%r, %r, %r)", 
+                       text, callback, default)
         self.text = text
         self.callback = callback if callback else self._callback(text)
         self.default = default
@@ -21,8 +21,9 @@ logging.getLogger(__name__).addHandler(logging.NullHandler())
 
 #TO-DO: move this elsewhere
 def debug(fn):
+    # looked up once per decorated function (not on every call)
+    logger = logging.getLogger(__name__)
     def DEBUG(*args, **kwargs):
-        logger = logging.getLogger(__name__)
         lvl = logger.level if logger.level != logging.DEBUG else None
         n = fn.func_name
         logger.debug(">> %s(%r, %r)", n, args, kwargs)
@@ -34,6 +35,30 @@ def debug(fn):
     return DEBUG
 
 
+def _asset(items):
+    """
+    :returns: items as a set (sets are returned as-is, None as empty set)
+    """
+    if isinstance(items, (set, frozenset)):
+        return items
+    try:
+        return set(items)
+    except TypeError:
+        return set()
+
+
+def _select(current, exclude=(), only=None):
+    """
+    :returns: list of items in current (filtered like TaskList.list())
+    """
+    current = set(current)
+    excluded = current.intersection(exclude)
+    left = current - excluded
+    if only is not None:
+        return list(_asset(only).intersection(left))
+    return list(left)
+
+
 class TaskList(object):
 
     def __init__(self, *args, **kwargs):
@@ -41,6 +66,8 @@ class TaskList(object):
         self.resources = resources.Resources(__name__)
         self._taskkeys = ['erase', 'prepare', 'installapps']
         self.config = self.resources.config
+        # task lists are re-read several times per run (see config.read())
+        self.config.cache = True
         self.file = self.config.file
         if kwargs.has_key('timeout'):
             self.config.lock.timeout = kwargs['timeout']
@@ -67,10 +94,7 @@ class TaskList(object):
         with self.config.lock.acquire():
             # get all items as set (or empty list)
             current = set(self.config.get(key, []))
-            try:
-                o = set(only) 
-            except TypeError:
-                o = set()
+            o = _asset(only)
             # only exclude what was there to begin with
             excluded = current.intersection(exclude)
             # what's left after removing exclusions (if any)
@@ -96,19 +120,7 @@ class TaskList(object):
         """
         # similar logic to get() except no writing
         with self.config.lock.acquire():
-            current = set(self.config.get(key, []))
-            try:
-                o = set(only) 
-            except TypeError:
-                o = set()
-            excluded = current.intersection(exclude)
-            left = current - excluded
-            o = o.intersection(left)
-            if only is not None:
-                return list(o)
-            if left:
-                return list(left)
-            return []
+            return _select(self.config.get(key, []), exclude, only)
 
     @debug
     def add(self, key, items, exclude=()):
@@ -136,11 +148,41 @@ class TaskList(object):
                 raise TypeError("{0!r}: not list or set".format(items))
             _items = set(items).difference(exclude)
             if _items:
+                data = self.record
+                current = data.setdefault(key, [])
+                # only write ECIDs that aren't already tasked
+                _items.difference_update(current)
+                if _items:
+                    self.log.debug("adding: %r: %r", key, _items)
+                    current.extend(_items)
+                    self.config.write(data)
+
+    def add_many(self, tasks, exclude=()):
+        """
+        Add items to multiple tasks with a single write
+
+        :param dict tasks:          {task: items} to add
+        :param iterable exclude:    ignore items (present or not)
+
+        :returns: None
+        """
+        if not tasks:
+            self.log.debug("nothing to add")
+            return
+        with self.config.lock.acquire():
+            data = self.record
+            modified = False
+            for key, items in tasks.items():
+                current = data.setdefault(key, [])
+                # only add ECIDs that aren't already tasked
+                _items = set(items).difference(exclude, current)
+                if not _items:
+                    continue
                 self.log.debug("adding: %r: %r", key, _items)
-                try:
-                    self.config.add(key, _items)
-                except KeyError:
-                    self.config.update({key: list(_items)})
+                current.extend(_items)
+                modified = True
+            if modified:
+                self.config.write(data)
 
     def remove(self, ecids, tasks=None, queries=None):
         """
@@ -178,6 +220,21 @@ class TaskList(object):
                     for q in queries:
                         self.query(q, only=ecids)
         
+    def pending_summary(self, keys=None):
+        """
+        List tasked ECIDs for multiple tasks (all ECIDs remain tasked)
+        using a single read of the task record
+
+        :param iterable keys:   names of tasks
+                                    (default: erase, prepare, installapps)
+
+        :returns: dict of {task: [ECIDs]}
+        """
+        if keys is None:
+            keys = self._taskkeys
+        record = self.record
+        return {k: list(record.get(k, [])) for k in keys}
+
     #TO-DO: rename to 'empty' or all
     def alldone(self):
         """
@@ -193,11 +250,11 @@ class TaskList(object):
         """
         :returns: list of query keys
         """
-        result = []
-        for k in self.list('queries'):
-            if self.list(k, exclude, only):
-                result.append(k)
-        return result
+        # every query is checked from a single read
+        with self.config.lock.acquire():
+            record = self.record
+        return [k for k in record.get('queries', [])
+                if _select(record.get(k, []), exclude, only)]
     
     def query(self, key, ecids=(), exclude=(), only=None):
         with self.config.lock.acquire():
@@ -217,6 +274,20 @@ class TaskList(object):
                         pass
                 return ecids
 
+    def query_many(self, queries, exclude=()):
+        """
+        Add ECIDs to multiple queries with a single write
+
+        :param dict queries:        {query: ECIDs} to add
+        :param iterable exclude:    ignore ECIDs (present or not)
+
+        :returns: None
+        """
+        with self.config.batch():
+            for key, ecids in queries.items():
+                if ecids:
+                    self.query(key, ecids, exclude)
+
     def erase(self, ecids=(), exclude=(), only=None):
         """
         Convenience function for add('erase') and get('erase')
@@ -15,6 +15,8 @@ import plistlib
 import json
 import logging
 
+from . import utility
+
 __author__ = 'Sam Forester'
 __email__ = 'sam.forester@utah.edu'
 __copyright__ = 'Copyright(c) 2019 University of Utah, Marriott Library'
@@ -143,7 +145,8 @@ def assetcachetetheratorutil(arg, json=True, log=None):
     if json:
         cmd += ['--json']
     cmd += [arg]
-    log.debug("> {0}".format(" ".join(cmd)))
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("> %s", " ".join(cmd))
     p = subprocess.Popen(cmd, stdout=subprocess.PIPE, 
                               stderr=subprocess.PIPE)
     out, err = p.communicate()
@@ -239,13 +242,12 @@ def wait_for_devices(previous, timeout=10, poll=2, **kwargs):
                 found.append(sn)
 
             if device['Checked In']:
-                logger.debug("{0} tethered!".format(name))
+                logger.debug("%s tethered!", name)
                 tethered.append(sn)
         
         # superfluous logging
         if appeared:
-            msg = "device(s) appeared: {0}".format(", ".join(appeared))
-            logger.debug(msg)
+            logger.debug("device(s) appeared: %s", ", ".join(appeared))
             
         sn_set = set(found + prev_sn)
         # list of items that 
@@ -272,7 +274,7 @@ def tethered_caching(args):
     logger = logging.getLogger(__name__)
     try:
         cmd = ['/usr/bin/sudo', '-n', _bin, args]
-        logger.debug("> {0}".format(" ".join(cmd)))
+        logger.debug("> %s", " ".join(cmd))
         subprocess.check_call(cmd, stdout=subprocess.PIPE,
                                    stderr=subprocess.PIPE)
     except subprocess.CalledProcessError as e:
@@ -404,5 +406,22 @@ def devices_are_tethered(sns, strict=False, **kwargs):
     return all_tethered
 
 
+def wait_tethered(sns, timeout=10, poll=0.25, maximum=2.0, **kwargs):
+    """
+    Wait for devices to be tethered
+
+    NOTE: tetherator has no change notification, so status is polled
+          quickly at first, backing off to every <maximum> seconds
+
+    :param sns:         list of device serial numbers
+    :param timeout:     seconds to wait
+
+    :returns: True if all specified devices were tethered in time
+    """
+    def _tethered():
+        return devices_are_tethered(sns, **kwargs)
+    return utility.poll_until(_tethered, timeout, poll, maximum)
+
+
 if __name__ == '__main__':
     pass
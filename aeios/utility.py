@@ -3,6 +3,7 @@
 import os
 import re
 import sys
+import time
 import shutil
 import logging
 import logging.config
@@ -55,10 +56,19 @@ LOGGING = {
             'backupCount': 5,
             'filename': None,
         },
+        # buffer file records (flushed on errors, between automation
+        #   phases, and at exit)
+        'buffer': {
+            'level': 'DEBUG',
+            'class': 'logging.handlers.MemoryHandler',
+            'capacity': 512,
+            'flushLevel': 'ext://logging.ERROR',
+            'target': 'file',
+        },
     },
     'root': {
         'level': 'DEBUG',
-        'handlers': ["file", "console"]
+        'handlers': ["buffer", "console"]
     }
 }
 
@@ -501,6 +511,43 @@ def extract(p12, outfile, passwd, args, tool):
     return outfile
 
 
+def poll_until(predicate, timeout, interval=0.5, maximum=5.0):
+    """
+    Call predicate() until it returns True, backing off between calls
+
+    :param predicate:   callable
+    :param timeout:     seconds to keep polling
+    :param interval:    initial delay (grows by 1.5x up to maximum)
+
+    :returns: True if predicate() was satisfied, otherwise False
+    """
+    stoptime = time.time() + timeout
+    while not predicate():
+        if time.time() > stoptime:
+            return False
+        time.sleep(interval)
+        interval = min(interval * 1.5, maximum)
+    return True
+
+
+def modified(path, mtime):
+    """
+    Check if a directory needs to be re-scanned since mtime
+    (directories modified within the last second are always re-scanned,
+     mtime may not have changed for a newly added file)
+
+    :param path:    path to directory
+    :param mtime:   st_mtime of the directory when it was last scanned
+                    (None if never scanned)
+
+    :returns: tuple (modified, current st_mtime)
+    """
+    current = os.stat(path).st_mtime
+    if mtime is None or current != mtime:
+        return True, current
+    return (time.time() - current) <= 1, current
+
+
 def run():
     """
     Attempt at script level recursion and daemonization
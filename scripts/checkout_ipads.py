@@ -52,10 +52,19 @@ LOGGING = {
             'backupCount': 5,
             'filename': None,
         },
+        # buffer file records (flushed on errors, between automation
+        #   phases, and at exit)
+        'buffer': {
+            'level': 'DEBUG',
+            'class': 'logging.handlers.MemoryHandler',
+            'capacity': 512,
+            'flushLevel': 'ext://logging.ERROR',
+            'target': 'file',
+        },
     },
     'root': {
         'level': 'DEBUG',
-        'handlers': ["file", "console"]
+        'handlers': ["buffer", "console"]
     }
 }
 
@@ -161,6 +161,20 @@ class MinimalResultsTest(ResultTestCase):
         self.assertIsNone(self.result.get('0x000000001'))
 
 
+class PartialResultsTest(ResultTestCase):
+
+    def setUp(self):
+        ResultTestCase.setUp(self)
+        self.ecids = ['0x000000001', '0x000000002', '0x000000003']
+        self.cfgout = {'Output': {}, 'Command': 'test',
+                       'Devices': ['0x000000002']}
+        self.result = cfgutil.Result(self.cfgout, self.ecids)
+
+    def test_missing(self):
+        expected = ['0x000000001', '0x000000003']
+        self.assertEquals(self.result.missing, expected)
+
+
 class EmptyResult(ResultTestCase):
     """
     Tests for minimal Result
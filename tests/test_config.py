@@ -503,6 +503,123 @@ class TestSetDefault(unittest.TestCase):
             self.config.setdefault('exists', 'blah')
 
 
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(TMPDIR, 'batch')
+        self.config = config.Manager(id='test', path=self.path)
+        self.config.write({'string': 'string', 'list': []})
+        
+    def tearDown(self):
+        try:
+            os.remove(self.config.file)
+        except OSError as e:
+            if e.errno != 2:
+                raise
+
+    def test_batch_reads_changes(self):
+        with self.config.batch():
+            self.config.update({'string': 'modified'})
+            self.assertEquals(self.config.get('string'), 'modified')
+
+    def test_batch_deferred_write(self):
+        """
+        test changes are not written until the batch exits
+        """
+        with self.config.batch():
+            self.config.update({'string': 'modified'})
+            self.config.add('list', ['a', 'b'])
+            data = plistlib.readPlist(self.config.file)
+            self.assertEquals(data['string'], 'string')
+        data = plistlib.readPlist(self.config.file)
+        self.assertEquals(data['string'], 'modified')
+        self.assertEquals(data['list'], ['a', 'b'])
+
+    def test_batch_unmodified_not_written(self):
+        with self.config.batch():
+            self.config.get('string')
+            os.remove(self.config.file)
+        self.assertFalse(os.path.exists(self.config.file))
+
+    def test_batch_nested(self):
+        with self.config.batch():
+            with self.config.batch():
+                self.config.update({'string': 'nested'})
+            data = plistlib.readPlist(self.config.file)
+            self.assertEquals(data['string'], 'string')
+        self.assertEquals(self.config.get('string'), 'nested')
+
+    def test_batch_written_on_exception(self):
+        with self.assertRaises(ValueError):
+            with self.config.batch():
+                self.config.update({'string': 'modified'})
+                raise ValueError()
+        self.assertEquals(self.config.get('string'), 'modified')
+
+    def test_batch_missing_file(self):
+        os.remove(self.config.file)
+        with self.config.batch():
+            with self.assertRaises(config.Error):
+                self.config.read()
+            self.config.write({'created': True})
+        self.assertTrue(self.config.get('created'))
+
+
+class TestReadCache(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(TMPDIR, 'cache')
+        self.config = config.Manager(id='test', path=self.path)
+        self.config.cache = True
+        self.config.write({'string': 'string', 'list': []})
+        # make the file look settled (see Manager.read())
+        self.settle()
+        
+    def tearDown(self):
+        try:
+            os.remove(self.config.file)
+        except OSError as e:
+            if e.errno != 2:
+                raise
+
+    def settle(self, seconds=5):
+        past = time.time() - seconds
+        os.utime(self.config.file, (past, past))
+
+    def test_cached_read(self):
+        self.config.read()
+        self.assertIsNotNone(self.config._cached)
+        self.assertEquals(self.config.get('string'), 'string')
+
+    def test_cached_read_returns_copy(self):
+        data = self.config.read()
+        data['list'].append('modified')
+        self.assertEquals(self.config.read()['list'], [])
+
+    def test_external_modification(self):
+        self.config.read()
+        plistlib.writePlist({'string': 'external'}, self.config.file)
+        self.settle(seconds=3)
+        self.assertEquals(self.config.get('string'), 'external')
+
+    def test_recent_modification_not_cached(self):
+        self.config.update({'string': 'modified'})
+        self.config.read()
+        self.assertIsNone(self.config._cached)
+        self.assertEquals(self.config.get('string'), 'modified')
+
+    def test_missing_file(self):
+        self.config.read()
+        os.remove(self.config.file)
+        with self.assertRaises(config.Error):
+            self.config.read()
+
+    def test_cache_disabled(self):
+        self.config.cache = False
+        self.config.read()
+        self.assertIsNone(self.config._cached)
+
+
 class TestThreaded(unittest.TestCase):
     """
     Tests involving threading
@@ -584,5 +701,58 @@ class TestLocking(unittest.TestCase):
                 data = self.config.read()
         
 
+class TestReentrantLocking(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(TMPDIR, 'locking')
+        self.config = config.Manager(id='test', path=self.path, timeout=0)
+        self.config.write({})
+        self.lock = config.ReentrantFileLock(self.config.lockfile, timeout=1)
+
+    def tearDown(self):
+        self.lock.release(force=True)
+
+    def test_double_lock(self):
+        with self.lock.acquire():
+            with self.lock.acquire(timeout=0):
+                self.assertTrue(self.lock.locked)
+            self.assertTrue(self.lock.locked)
+        self.assertFalse(self.lock.locked)
+
+    def test_write_locked(self):
+        with self.lock.acquire():
+            with self.assertRaises(config.TimeoutError):
+                self.config.write({})
+
+    def test_other_thread_blocked(self):
+        result = []
+        def _acquire():
+            try:
+                with self.lock.acquire(timeout=0.2):
+                    result.append('acquired')
+            except config.TimeoutError:
+                result.append('timeout')
+
+        with self.lock.acquire():
+            t = threading.Thread(target=_acquire)
+            t.start()
+            t.join()
+        self.assertEquals(result, ['timeout'])
+
+    def test_other_thread_after_release(self):
+        result = []
+        def _acquire():
+            with self.lock.acquire(timeout=1):
+                result.append(self.lock.owned)
+
+        with self.lock.acquire():
+            pass
+        t = threading.Thread(target=_acquire)
+        t.start()
+        t.join()
+        self.assertEquals(result, [True])
+        self.assertFalse(self.lock.locked)
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=1)
@@ -180,6 +180,18 @@ class TestExistingDeviceInit(unittest.TestCase):
         for k in new.keys():
             self.assertNotEqual(result[k], self.orig[k])
 
+    def test_updateall_unchanged_not_written(self):
+        # backdate the file so any re-write would be detected
+        os.utime(self.file, (1000, 1000))
+        self.device.updateall(self.orig)
+        self.assertEquals(os.stat(self.file).st_mtime, 1000)
+
+    def test_updateall_changed(self):
+        self.device.updateall({'deviceName': 'iPad'})
+        result = plistlib.readPlist(self.file)
+        self.assertEquals(result['deviceName'], 'iPad')
+        self.assertEquals(result['UDID'], self.orig['UDID'])
+
     def test_verify_mismatching_deviceType(self):
         mismatch = {'deviceType': 'mismatch'}
         with self.assertRaises(device.DeviceError):
@@ -266,6 +278,35 @@ class TestDeviceState(unittest.TestCase):
         self.device.enrolled = now
         self.assertEquals(self.device.enrolled, now)
 
+    def test_snapshot(self):
+        now = datetime.now().replace(microsecond=0)
+        self.device.checkin = now
+        self.device.supervised = True
+        snapshot = self.device.snapshot()
+        self.assertEquals(snapshot.checkin, now)
+        self.assertTrue(snapshot.supervised)
+        self.assertEquals(snapshot.background, 'background.png')
+
+    def test_batch_single_write(self):
+        # backdate the file so any write would be detected
+        os.utime(self.file, (1000, 1000))
+        with self.device.batch():
+            self.device.supervised = True
+            self.device.delete('background')
+            self.assertEquals(os.stat(self.file).st_mtime, 1000)
+        self.assertNotEquals(os.stat(self.file).st_mtime, 1000)
+        r = self.device.record
+        self.assertTrue(r['isSupervised'])
+        self.assertFalse(r.has_key('background'))
+
+    def test_snapshot_defaults(self):
+        self.device.erased = datetime.now()
+        snapshot = self.device.snapshot()
+        self.assertFalse(snapshot.supervised)
+        self.assertFalse(snapshot.verified)
+        self.assertEquals(snapshot.apps, [])
+        self.assertIsNone(snapshot.background)
+
 
 class TestDeviceName(unittest.TestCase):
 
@@ -834,6 +875,61 @@ class DeviceListTest(unittest.TestCase):
         self.assertIsNot(identical, self.devices[0])
         self.assertTrue(identical in self.devicelist)
 
+    def test_ecids(self):
+        expected = [x['ECID'] for x in self.data]
+        self.assertEquals(self.devicelist.ecids, expected)
+
+    def test_ecids_after_append(self):
+        devicelist = device.DeviceList(self.devices[:2])
+        self.assertEquals(len(devicelist.ecids), 2)
+        devicelist.append(self.devices[2])
+        self.assertEquals(devicelist.ecids, self.devicelist.ecids)
+        self.assertTrue(self.devices[2] in devicelist)
+
+    def test_ecids_after_remove(self):
+        self.devicelist.ecids
+        self.devicelist.remove(self.devices[0])
+        self.assertFalse(self.devices[0] in self.devicelist)
+        self.assertEquals(len(self.devicelist.udids), 2)
+
+    def test_ecids_returns_copy(self):
+        self.devicelist.ecids.append('0x0')
+        self.assertEquals(len(self.devicelist.ecids), 3)
+
+    def test_ecidset(self):
+        ecidset = self.devicelist.ecidset
+        self.assertIsInstance(ecidset, frozenset)
+        self.assertEquals(ecidset, frozenset(self.devicelist.ecids))
+
+    def test_ecidset_after_remove(self):
+        self.devicelist.ecidset
+        self.devicelist.remove(self.devices[0])
+        self.assertNotIn(self.devices[0].ecid, self.devicelist.ecidset)
+
+    def test_partition_supervised(self):
+        self.devices[0].supervised = True
+        supervised, unsupervised = self.devicelist.partition_supervised()
+        self.assertIsInstance(supervised, device.DeviceList)
+        self.assertEquals(supervised, self.devicelist.supervised)
+        self.assertEquals(unsupervised, self.devicelist.unsupervised)
+        self.assertEquals(len(unsupervised), 2)
+
+    def test_set_attr(self):
+        now = datetime.now().replace(microsecond=0)
+        self.devicelist.set_attr('checkin', now)
+        for d in self.devices:
+            self.assertEquals(d.checkin, now)
+
+    def test_set_attr_empty(self):
+        device.DeviceList().set_attr('checkin', datetime.now())
+
+    def test_update(self):
+        now = datetime.now().replace(microsecond=0)
+        self.devicelist.update(checkin=now, supervised=True)
+        for d in self.devices:
+            self.assertEquals(d.checkin, now)
+            self.assertTrue(d.supervised)
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=1)
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import os
+import time
 import types
 import shutil
 import logging
@@ -317,6 +318,10 @@ class TestListRefresh(BaseTestCase):
             self.manager.config.delete('Devices')
         except:
             pass
+        try:
+            self.manager.config.delete('Stopped')
+        except:
+            pass
 
     def test_default_list(self):
         """
@@ -380,6 +385,115 @@ class TestListRefresh(BaseTestCase):
         # verify manager.list() refreshes the list
         self.assertEquals(result, self.empty())
 
+    def _counted(self):
+        """
+        replace cfgutil.list with function that counts calls
+        """
+        calls = []
+        def _list(*args, **kwargs):
+            calls.append(True)
+            return self.empty()
+        cfgutil.list = _list
+        return calls
+
+    def test_listed_recently_not_refreshed(self):
+        """
+        test list isn't refreshed if this manager listed recently
+        """
+        self.manager.list(refresh=True)
+        # expire the timestamp shared with other processes
+        timestamp = self.now - dt.timedelta(minutes=1)
+        self.manager.config.update({'lastListed': timestamp})
+        calls = self._counted()
+        self.manager.list()
+        self.assertEquals(calls, [])
+
+    def test_listed_expired_refreshed(self):
+        """
+        test list is refreshed once this manager's listing expires
+        """
+        self.manager.list(refresh=True)
+        timestamp = self.now - dt.timedelta(minutes=1)
+        self.manager.config.update({'lastListed': timestamp})
+        # this manager listed 1 minute ago
+        self.manager._listed = time.time() - 60
+        calls = self._counted()
+        self.manager.list()
+        self.assertEquals(len(calls), 1)
+
+    def test_stopped_not_refreshed(self):
+        """
+        test stopped manager returns the last listed devices
+        """
+        timestamp = self.now - dt.timedelta(minutes=1)
+        self.manager.config.update({'lastListed': timestamp,
+                                    'Stopped': True})
+        calls = self._counted()
+        result = self.manager.list()
+        self.assertEquals(calls, [])
+        self.assertEquals(result, self.listed)
+
+
+class TestAuthorization(BaseTestCase):
+    """
+    Tests for DeviceManager without a supervision identity
+    """
+    @classmethod
+    def setUpClass(cls):
+        super(cls, cls).setUpClass()
+        # save original cfgutil.erase function for restore after tests
+        cls._cfgerase = cfgutil.erase
+
+    @classmethod
+    def tearDownClass(cls):
+        cfgutil.erase = cls._cfgerase
+
+    def setUp(self):
+        BaseTestCase.setUp(self)
+        if os.listdir(self.manager.resources.supervision):
+            self.skipTest("supervision identity exists")
+        self.ecid = self.env[0]['ECID']
+
+    def tearDown(self):
+        BaseTestCase.tearDown(self)
+        cfgutil.erase = self.__class__._cfgerase
+        self.manager.stopped = False
+        self.manager.task.remove([self.ecid])
+        self.manager.task.get('restart', only=[self.ecid])
+        # other tests expect the device to not be restarting
+        device = self.manager.device(self.ecid, self.env[0])
+        device.restarting = False
+        device.erased = None
+
+    def test_missing_identity(self):
+        """
+        test missing supervision identity returns None
+        """
+        self.assertIsNone(self.manager.authorization())
+
+    def test_missing_identity_required(self):
+        """
+        test missing supervision identity raises when it is required
+        """
+        with self.assertRaises(cfgutil.AuthenticationError):
+            self.manager._required_authorization()
+
+    def test_erase_without_identity(self):
+        """
+        test devices are erased without a supervision identity
+        """
+        device = self.manager.device(self.ecid, self.env[0])
+        self.manager.task.erase([self.ecid])
+        called = []
+        def _erase(ecids, auth=None):
+            called.append(auth)
+            return cfgutil.Result({'Devices': ecids, 'Output': {}}, ecids)
+        cfgutil.erase = _erase
+        # erase() stops automation for the restart
+        with self.assertRaises(devicemanager.Stopped):
+            self.manager.erase(devicemanager.DeviceList([device]))
+        self.assertEquals(called, [None])
+
 
 # @unittest.skip("Not implemented")
 class TestRecords(BaseTestCase):
@@ -432,6 +546,119 @@ class TestRecords(BaseTestCase):
         self.assertEquals([], self.manager.records(['test']))
 
 
+class TestRecordsCache(BaseTestCase):
+    """
+    Tests for the device records scan cache (see records())
+    """
+    def setUp(self):
+        BaseTestCase.setUp(self)
+        self.dir = self.manager.resources.devices
+        self.ecid = '0x123456789ABCDF'
+        self.record = os.path.join(self.dir, "{0}.plist".format(self.ecid))
+
+    def tearDown(self):
+        BaseTestCase.tearDown(self)
+        try:
+            os.remove(self.record)
+        except OSError as e:
+            if e.errno != 2:
+                raise
+
+    def add_record(self):
+        with open(self.record, 'w') as f:
+            f.write('')
+
+    def test_unmodified_scan_reused(self):
+        """
+        test directory isn't re-scanned if it hasn't been modified
+        """
+        # backdate the directory (outside of the 1 second re-scan window)
+        os.utime(self.dir, (1000, 1000))
+        scanned = self.manager._scan_records()
+        self.assertIs(self.manager._scan_records(), scanned)
+
+    def test_new_record(self):
+        """
+        test new record is found after the directory was modified
+        """
+        os.utime(self.dir, (1000, 1000))
+        self.manager.records()
+        self.add_record()
+        ecids = [e for e, p in self.manager.records()]
+        self.assertIn(self.ecid, ecids)
+
+    def test_new_record_same_mtime(self):
+        """
+        test new record is found when the directory mtime didn't change
+        (modified within the last second)
+        """
+        # directory was just modified (whole seconds, so the mtime can
+        # be restored exactly below)
+        mtime = int(time.time()) + 1
+        os.utime(self.dir, (mtime, mtime))
+        self.manager.records()
+        self.add_record()
+        # mtime granularity can hide the modification
+        os.utime(self.dir, (mtime, mtime))
+        ecids = [e for e, p in self.manager.records()]
+        self.assertIn(self.ecid, ecids)
+
+
+class TestFindall(BaseTestCase):
+    """
+    Tests for findall() memoization
+    """
+    def setUp(self):
+        BaseTestCase.setUp(self)
+        self.ecid = self.env[0]['ECID']
+        self.manager.device(self.ecid, self.env[0])
+        self.new = dict(self.env[0], ECID='0x123456789ABCDE',
+                        UDID='aa111222333444555666777888999abcdefabcde')
+        self.record = os.path.join(self.manager.resources.devices, 
+                                   "{0}.plist".format(self.new['ECID']))
+        # memoize results
+        self.manager.findall()
+        self.assertTrue(self.manager._findall)
+
+    def tearDown(self):
+        BaseTestCase.tearDown(self)
+        self.manager.task.remove([self.ecid, self.new['ECID']])
+        try:
+            os.remove(self.record)
+        except OSError as e:
+            if e.errno != 2:
+                raise
+
+    def test_memoized(self):
+        """
+        test memoized results are returned
+        """
+        expected = self.manager.findall()
+        self.assertEquals(self.manager.findall(), expected)
+
+    def test_checkin_invalidates(self):
+        """
+        test checkin clears memoized results
+        """
+        self.manager.checkin(self.env[0], run=False)
+        self.assertEquals(self.manager._findall, {})
+
+    def test_checkout_invalidates(self):
+        """
+        test checkout clears memoized results
+        """
+        self.manager.checkout(self.env[0])
+        self.assertEquals(self.manager._findall, {})
+
+    def test_new_record_invalidates(self):
+        """
+        test new device record clears memoized results
+        """
+        self.manager.device(self.new['ECID'], self.new)
+        self.assertEquals(self.manager._findall, {})
+        self.assertIn(self.new['ECID'], self.manager.findall().ecids)
+
+
 class TestCache(BaseTestCase):
     
     def setUp(self):
@@ -440,14 +667,51 @@ class TestCache(BaseTestCase):
 
 
 class TestVerify(BaseTestCase):
-    pass
+
+    @classmethod
+    def setUpClass(cls):
+        super(cls, cls).setUpClass()
+        cls._cfglist = cfgutil.list
+
+    @classmethod
+    def tearDownClass(cls):
+        cfgutil.list = cls._cfglist
+
+    def setUp(self):
+        BaseTestCase.setUp(self)
+        self.ecid = self.env[0]['ECID']
+        self.device = self.manager.device(self.ecid, self.env[0])
+        self.device.restarting = False
+        # nothing is connected
+        cfgutil.list = lambda *args, **kwargs: []
+        self.manager.list(refresh=True)
+
+    def tearDown(self):
+        BaseTestCase.tearDown(self)
+        cfgutil.list = self.__class__._cfglist
+        self.manager.task.remove([self.ecid])
+
+    def test_unavailable_tasks_removed(self):
+        """
+        test tasks are removed when no devices are connected
+        """
+        self.manager.task.erase([self.ecid])
+        self.manager._verify()
+        self.assertNotIn(self.ecid, self.manager.task.list('erase'))
+
+    def test_unavailable_checked_out(self):
+        """
+        test unavailable devices are checked out when none are connected
+        """
+        self.device.checkout = None
+        self.manager._verify()
+        self.assertIsNotNone(self.device.checkout)
 
 
 class TestThreaded(BaseTestCase):
     pass
 
 
-
 if __name__ == '__main__':
     fmt = ('%(asctime)s %(process)d: %(levelname)6s: '
            '%(name)s - %(funcName)s(): %(message)s')
@@ -105,6 +105,13 @@ class TestTaskListBasic(BaseTestCase):
         result = self.task.record['install']
         self.assertItemsEqual(self.ecids, result)
 
+    def test_add_duplicate_not_written(self):
+        self.task.add('install', self.ecids)
+        # backdate the file so any re-write would be detected
+        os.utime(self.task.file, (1000, 1000))
+        self.task.add('install', self.ecids)
+        self.assertEquals(os.stat(self.task.file).st_mtime, 1000)
+
     def test_add_missing_key(self):
         self.task.add('test', self.ecids)
         self.assertTrue(self.task.record['test'])
@@ -548,6 +555,75 @@ class TestTaskListQueries(BaseTestCase):
         self.assertFalse(self.task.record.has_key('isSupervised'))
 
 
+class TestTaskListAddMany(BaseTestCase):
+
+    def test_add_many(self):
+        self.task.add_many({'erase': self.ecids, 'prepare': self.only})
+        self.assertItemsEqual(self.task.list('erase'), self.ecids)
+        self.assertItemsEqual(self.task.list('prepare'), self.only)
+
+    def test_add_many_existing(self):
+        self.task.erase([self.ecids[0]])
+        self.task.add_many({'erase': self.ecids})
+        self.assertItemsEqual(self.task.record['erase'], self.ecids)
+
+    def test_add_many_exclude(self):
+        self.task.add_many({'erase': self.ecids}, exclude=[self.ecids[0]])
+        self.assertEquals(self.task.list('erase'), [self.ecids[1]])
+
+    def test_add_many_empty(self):
+        self.task.add_many({})
+        self.task.add_many({'erase': []})
+        self.assertTrue(self.task.alldone())
+
+
+class TestTaskListQueryMany(BaseTestCase):
+
+    def test_query_many(self):
+        self.task.query_many({'isSupervised': self.ecids, 
+                              'installedApps': self.only})
+        self.assertItemsEqual(self.task.queries(), 
+                              ['isSupervised', 'installedApps'])
+        self.assertItemsEqual(self.task.list('isSupervised'), self.ecids)
+        self.assertItemsEqual(self.task.list('installedApps'), self.only)
+
+    def test_query_many_empty(self):
+        self.task.query_many({'isSupervised': []})
+        self.assertEquals(self.task.queries(), [])
+
+    def test_query_many_exclude(self):
+        self.task.query_many({'isSupervised': self.ecids}, 
+                             exclude=[self.ecids[0]])
+        self.assertEquals(self.task.list('isSupervised'), [self.ecids[1]])
+
+
+class TestTaskListPendingSummary(BaseTestCase):
+
+    def test_summary_empty(self):
+        result = self.task.pending_summary()
+        expected = {'erase': [], 'prepare': [], 'installapps': []}
+        self.assertEquals(result, expected)
+
+    def test_summary_tasks(self):
+        self.task.erase(self.ecids)
+        self.task.installapps(self.only)
+        result = self.task.pending_summary()
+        self.assertItemsEqual(result['erase'], self.ecids)
+        self.assertEquals(result['prepare'], [])
+        self.assertEquals(result['installapps'], self.only)
+
+    def test_summary_does_not_empty_tasks(self):
+        self.task.erase(self.ecids)
+        self.task.pending_summary()
+        self.assertItemsEqual(self.task.list('erase'), self.ecids)
+
+    def test_summary_keys(self):
+        self.task.query('isSupervised', self.ecids)
+        result = self.task.pending_summary(['isSupervised', 'missing'])
+        self.assertItemsEqual(result['isSupervised'], self.ecids)
+        self.assertEquals(result['missing'], [])
+
+
 class TestTaskListRepeatQueries(BaseTestCase):
 
     def test_query_then_exclusion(self):
@@ -325,6 +325,19 @@ class TestDevices(MockOutputTestCase):
         tethered = tethering.devices_are_tethered(sns, _mock=m)
         self.assertFalse(tethered)
 
+    def test_wait_tethered(self):
+        tethering.ENABLED = True
+        m = (0, 'status')
+        tethered = tethering.wait_tethered(['DMPVAA00J28K'], _mock=m)
+        self.assertTrue(tethered)
+
+    def test_wait_tethered_timeout(self):
+        tethering.ENABLED = True
+        m = (0, 'status')
+        tethered = tethering.wait_tethered(['DMPWAA01JF8J'], timeout=0.1,
+                                           poll=0.01, _mock=m)
+        self.assertFalse(tethered)
+
 
 class TestEnabled(MockOutputTestCase):
 
@@ -2,6 +2,7 @@
 
 import os
 import sys
+import time
 import shutil
 import logging
 import unittest
@@ -593,6 +594,67 @@ class TestModifications(BaseTestCase):
         
     
 
+
+class TestPollUntil(unittest.TestCase):
+
+    def test_satisfied_immediately(self):
+        calls = []
+        def _predicate():
+            calls.append(True)
+            return True
+        self.assertTrue(utility.poll_until(_predicate, 1))
+        self.assertEquals(len(calls), 1)
+
+    def test_satisfied_eventually(self):
+        calls = []
+        def _predicate():
+            calls.append(True)
+            return len(calls) == 3
+        result = utility.poll_until(_predicate, 1, interval=0.01)
+        self.assertTrue(result)
+        self.assertEquals(len(calls), 3)
+
+    def test_timeout(self):
+        result = utility.poll_until(lambda: False, 0.05, interval=0.01)
+        self.assertFalse(result)
+
+
+class TestModified(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(TMPDIR, 'modified')
+        os.mkdir(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_never_scanned(self):
+        modified, mtime = utility.modified(self.path, None)
+        self.assertTrue(modified)
+        self.assertEquals(mtime, os.stat(self.path).st_mtime)
+
+    def test_unchanged(self):
+        past = int(time.time()) - 10
+        os.utime(self.path, (past, past))
+        modified, mtime = utility.modified(self.path, past)
+        self.assertFalse(modified)
+        self.assertEquals(mtime, past)
+
+    def test_changed(self):
+        past = int(time.time()) - 10
+        os.utime(self.path, (past, past))
+        modified, mtime = utility.modified(self.path, past - 10)
+        self.assertTrue(modified)
+        self.assertEquals(mtime, past)
+
+    def test_modified_within_last_second(self):
+        # mtime unchanged, but a file may have been added in the same second
+        now = int(time.time()) + 1
+        os.utime(self.path, (now, now))
+        modified, mtime = utility.modified(self.path, now)
+        self.assertTrue(modified)
+
+
 if __name__ == '__main__':
     fmt = ('%(asctime)s %(process)d: %(levelname)6s: '
            '%(name)s - %(funcName)s(): %(message)s')